@@ -1,4 +1,5 @@
 import logging
+from functools import cached_property
 from typing import Any, Optional
 
 from jwcrypto.common import JWException
@@ -90,3 +91,53 @@ class AuthenticationService:
         user = self.fetch_user(token_payload["email"], token_payload)
         logger.debug(f"User identified by token: {user=}")
         return user
+
+
+class WorkerAuthentication:
+    """
+    Authenticates the user of a single nameko worker, at most once per token.
+
+    Use :class:`~nameko_keycloak.dependencies.AuthenticationProvider` to get
+    an instance in your service. Keycloak client, ``fetch_user`` and
+    ``sso_cookie_prefix`` are read from the service instance on first use, so
+    repeated lookups in middleware, handlers and helpers neither decode the
+    token again nor call ``fetch_user`` again.
+    """
+
+    def __init__(self, worker_ctx):
+        self.worker_ctx = worker_ctx
+        self._users: dict[Token, Optional[User]] = {}
+
+    @cached_property
+    def service(self) -> AuthenticationService:
+        instance = self.worker_ctx.service
+        return AuthenticationService(
+            instance.keycloak,
+            instance.fetch_user,
+            getattr(instance, "sso_cookie_prefix", "nameko-keycloak"),
+        )
+
+    @cached_property
+    def user(self) -> Optional[User]:
+        """
+        User authenticated by the HTTP request handled by this worker.
+        """
+        for arg in self.worker_ctx.args:
+            if isinstance(arg, Request):
+                return self.get_user_from_request(arg)
+        return None
+
+    def get_user_from_access_token(self, access_token: Token) -> Optional[User]:
+        if access_token not in self._users:
+            self._users[access_token] = self.service.get_user_from_access_token(
+                access_token
+            )
+        return self._users[access_token]
+
+    def get_user_from_request(self, request: Request) -> Optional[User]:
+        token = get_token_from_request(
+            request, cookie_name=f"{self.service.sso_cookie_prefix}_access-token"
+        )
+        if not token:
+            return None
+        return self.get_user_from_access_token(token)
@@ -5,6 +5,8 @@ from pathlib import Path
 from keycloak import KeycloakOpenID
 from nameko.extensions import DependencyProvider
 
+from .auth import WorkerAuthentication
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,3 +26,16 @@ class KeycloakProvider(DependencyProvider):
 
     def get_dependency(self, worker_ctx) -> KeycloakOpenID:
         return self.provider
+
+
+class AuthenticationProvider(DependencyProvider):
+    """
+    Provides a :class:`~nameko_keycloak.auth.WorkerAuthentication` per worker.
+
+    The authenticated user is resolved lazily and memoized for the lifetime
+    of the worker. Nothing else keeps a reference to it, so it goes away
+    together with the worker.
+    """
+
+    def get_dependency(self, worker_ctx) -> WorkerAuthentication:
+        return WorkerAuthentication(worker_ctx)
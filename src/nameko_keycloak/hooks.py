@@ -0,0 +1,197 @@
+import enum
+import logging
+from typing import Any, Optional
+
+import eventlet
+from eventlet.event import Event
+from eventlet.queue import Empty, Full, Queue
+from nameko.extensions import DependencyProvider, Entrypoint
+
+logger = logging.getLogger(__name__)
+
+HookCall = tuple[str, tuple[Any, ...]]
+
+# queued by HookDispatcher.drain() to stop the background thread
+_STOP: HookCall = ("", ())
+
+
+class KeycloakHook(Entrypoint):
+    """
+    Marks a success or failure hook to be run by :class:`HookDispatcher`.
+
+    The dispatcher is drained when entrypoints stop. This way all queued
+    hooks get their workers while the container still waits for running
+    workers, before any dependency is stopped.
+    """
+
+    def stop(self) -> None:
+        for provider in self.container.dependencies:
+            if isinstance(provider, HookDispatcher):
+                provider.drain()
+
+
+keycloak_hook = KeycloakHook.decorator
+
+
+class OverflowPolicy(enum.Enum):
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+
+class HookDispatcher(DependencyProvider):
+    """
+    Runs SSO success/failure hooks in their own workers, in the background.
+
+    Hook methods decorated with :func:`keycloak_hook` are put on a bounded
+    queue instead of being called inline, so that hook latency does not add
+    to the response time of login handlers. A background thread spawns a
+    worker for every queued call, so hooks get fresh dependencies just like
+    any other entrypoint. It spawns up to ``batch_size`` workers at a time
+    before yielding to other greenthreads. Hooks without the decorator still
+    run inline.
+
+    When the queue holds ``maxsize`` pending calls, ``overflow`` decides what
+    happens to a new one:
+
+     - ``DROP_NEWEST`` - discard the new call
+     - ``DROP_OLDEST`` - discard the oldest pending call to make room
+     - ``BLOCK`` - wait until there is room in the queue
+
+    When the service stops, the dispatcher waits for running workers to
+    finish and spawns workers for all their hooks. Hooks dispatched after
+    that are spawned right away, bypassing the queue.
+
+    .. note::
+        Failure hooks run outside of the original ``except`` block, so they
+        can't read the original exception from ``sys.exc_info``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        batch_size: int = 50,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_NEWEST,
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.dropped = 0
+        self.gt: Optional[eventlet.greenthread.GreenThread] = None
+
+    def setup(self) -> None:
+        self.queue: Queue = Queue(maxsize=self.maxsize)
+        self.entrypoints = {
+            entrypoint.method_name: entrypoint
+            for entrypoint in self.container.entrypoints
+            if isinstance(entrypoint, KeycloakHook)
+        }
+        # workers which may still dispatch hooks, hook workers don't count
+        self.workers: set = set()
+        self._workers_done: Optional[Event] = None
+        self._drained: Optional[Event] = None
+
+    def start(self) -> None:
+        self.gt = self.container.spawn_managed_thread(self._run)
+
+    def stop(self) -> None:
+        self.drain()
+
+    def kill(self) -> None:
+        if self.gt is not None:
+            self.gt.kill()
+
+    def get_dependency(self, worker_ctx) -> "HookDispatcher":
+        if not isinstance(worker_ctx.entrypoint, KeycloakHook):
+            self.workers.add(worker_ctx)
+        return self
+
+    def worker_teardown(self, worker_ctx) -> None:
+        self.workers.discard(worker_ctx)
+        if not self.workers and self._workers_done is not None:
+            if not self._workers_done.ready():
+                self._workers_done.send(None)
+
+    def handles(self, method_name: str) -> bool:
+        """
+        Return True if ``method_name`` is a hook decorated with :func:`keycloak_hook`.
+        """
+        return method_name in self.entrypoints
+
+    def dispatch(self, method_name: str, *args: Any) -> None:
+        """
+        Schedule hook ``method_name`` to run in a new worker with ``args``.
+        """
+        if self._drained is not None and self._drained.ready():
+            # nothing reads the queue anymore
+            self._spawn([(method_name, args)])
+            return
+        if self.overflow == OverflowPolicy.BLOCK:
+            self.queue.put((method_name, args))
+            return
+        try:
+            self.queue.put_nowait((method_name, args))
+            return
+        except Full:
+            pass
+        self.dropped += 1
+        if self.overflow == OverflowPolicy.DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                pass
+            self.queue.put_nowait((method_name, args))
+            logger.warning("Hook queue full, dropped oldest hook call")
+        else:
+            logger.warning(f"Hook queue full, dropped call to {method_name}")
+
+    def drain(self) -> None:
+        """
+        Wait for running workers, spawn workers for all their pending hooks
+        and stop the background thread.
+        """
+        if self._drained is not None:
+            self._drained.wait()
+            return
+        self._drained = Event()
+        # let workers which were just spawned reach get_dependency()
+        eventlet.sleep(0)
+        while self.workers:
+            self._workers_done = Event()
+            self._workers_done.wait()
+        if self.gt is not None:
+            self.queue.put(_STOP)
+            # let the background thread finish its batch instead of killing it
+            self.gt.wait()
+        while batch := self._take(self.batch_size):
+            self._spawn(batch)
+        self._drained.send(None)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            batch.extend(self._take(self.batch_size - 1))
+            self._spawn(batch)
+            if any(call is _STOP for call in batch):
+                return
+            # let other greenthreads run between batches
+            eventlet.sleep(0)
+
+    def _take(self, count: int) -> list[HookCall]:
+        items: list[HookCall] = []
+        while len(items) < count:
+            try:
+                items.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return items
+
+    def _spawn(self, batch: list[HookCall]) -> None:
+        for call in batch:
+            if call is _STOP:
+                continue
+            method_name, args = call
+            try:
+                self.container.spawn_worker(self.entrypoints[method_name], args, {})
+            except Exception:
+                logger.exception(f"Failed to spawn worker for hook {method_name}")
@@ -0,0 +1,124 @@
+import enum
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+Clock = Callable[[], float]
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling Keycloak for a while after repeated failures.
+
+    The breaker starts closed and lets every call through. After
+    ``failure_threshold`` consecutive failures it opens and rejects all calls
+    for ``reset_timeout`` seconds. Then it moves to half-open state and lets
+    a single trial call through: success closes the breaker again, failure
+    reopens it for another ``reset_timeout``.
+
+    A single instance is meant to be shared by all workers of a service, so
+    that Keycloak degradation observed by one worker protects the others.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Clock = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Return True if a call to Keycloak may proceed.
+        """
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                logger.info("Circuit breaker half-open, allowing trial call")
+                self.state = CircuitState.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CircuitState.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CircuitState.CLOSED:
+                logger.info("Circuit breaker closed")
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if (
+                self.state == CircuitState.HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                if self.state != CircuitState.OPEN:
+                    logger.warning(
+                        f"Circuit breaker open after {self.failures} failure(s)"
+                    )
+                self.state = CircuitState.OPEN
+                self.opened_at = self.clock()
+                self._trial_in_flight = False
+
+    def release(self) -> None:
+        """
+        Give up a trial call without recording its outcome.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class TokenBucket:
+    """
+    Limits the rate of calls to Keycloak.
+
+    The bucket holds up to ``capacity`` tokens and is refilled with ``rate``
+    tokens per second. Every call takes one token; when the bucket is empty
+    the call is rejected instead of waiting for a token.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock: Clock = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """
+        Take a token from the bucket, return False if there are none left.
+        """
+        with self._lock:
+            now = self.clock()
+            elapsed = max(now - self.updated_at, 0.0)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
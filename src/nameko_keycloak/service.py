@@ -1,7 +1,8 @@
 import enum
 import json
 import logging
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
 from keycloak import KeycloakOpenID
 from keycloak.exceptions import KeycloakError
@@ -9,6 +10,8 @@ from werkzeug.utils import redirect
 from werkzeug.wrappers import Request, Response
 
 from .auth import AuthenticationService
+from .hooks import HookDispatcher
+from .resilience import CircuitBreaker, TokenBucket
 from .types import FetchUserCallable, TokenPayload, User
 
 logger = logging.getLogger(__name__)
@@ -19,6 +22,22 @@ class HookMethod(enum.Enum):
     FAILURE = "keycloak_failure"
 
 
+def _get_error_code(e: KeycloakError) -> str:
+    try:
+        payload = json.loads(e.response_body.decode("utf-8"))
+        return payload["error"]
+    except Exception:
+        logger.exception("Failed to decode Keycloak error details")
+        return ""
+
+
+def _is_server_failure(e: KeycloakError) -> bool:
+    if e.response_code is None or e.response_code >= 500:
+        return True
+    logger.debug(f"Keycloak client error: {e.response_code}")
+    return False
+
+
 class KeycloakSsoServiceMixin:
     """
     Add this to your nameko service to provide SSO authentication with Keycloak.
@@ -32,6 +51,13 @@ class KeycloakSsoServiceMixin:
      - ``sso_token_url`` - absolute URL to handler which delegates to :meth:`keycloak_token_sso`
      - ``sso_refresh_token_url`` - absolute URL to handler which delegates to :meth:`keycloak_refresh_token_sso`
      - ``frontend_url`` - absolute URL to a user-facing web app that communicates with this backend service
+     - ``keycloak_circuit_breaker`` - optional :class:`~nameko_keycloak.resilience.CircuitBreaker` guarding calls to Keycloak
+     - ``keycloak_rate_limiter`` - optional :class:`~nameko_keycloak.resilience.TokenBucket` limiting the rate of calls to Keycloak
+     - ``keycloak_hook_dispatcher`` - optional :class:`~nameko_keycloak.hooks.HookDispatcher` to run hooks in the background
+
+    When a call to Keycloak is rejected by the circuit breaker or the rate
+    limiter, the handler responds with 503 without contacting Keycloak.
+    Logout is the exception: it skips Keycloak but still deletes cookies.
     """
 
     keycloak: KeycloakOpenID
@@ -41,6 +67,9 @@ class KeycloakSsoServiceMixin:
     sso_token_url: str = "/token-sso"
     sso_refresh_token_url: str = "/refresh-token-sso"
     frontend_url: str = "/"
+    keycloak_circuit_breaker: Optional[CircuitBreaker] = None
+    keycloak_rate_limiter: Optional[TokenBucket] = None
+    keycloak_hook_dispatcher: Optional[HookDispatcher] = None
 
     def keycloak_login_sso(self, request: Request) -> Response:
         """
@@ -61,12 +90,21 @@ class KeycloakSsoServiceMixin:
         self.fetch_user: FetchUserCallable
         auth = AuthenticationService(self.keycloak, self.fetch_user)
         if request.args.get("code"):
-            token = self.keycloak.token(
-                code=request.args.get("code"),
-                grant_type=["authorization_code"],
-                redirect_uri=self.sso_token_url,
-            )
-            user = auth.get_user_from_access_token(access_token=token["access_token"])
+            if not self._keycloak_call_allowed():
+                return self._keycloak_unavailable_response()
+            with self._guard_keycloak_call():
+                token = self.keycloak.token(
+                    code=request.args.get("code"),
+                    grant_type=["authorization_code"],
+                    redirect_uri=self.sso_token_url,
+                )
+            # decoding the token fetches certs from Keycloak
+            if not self._keycloak_call_allowed():
+                return self._keycloak_unavailable_response()
+            with self._guard_keycloak_call():
+                user = auth.get_user_from_access_token(
+                    access_token=token["access_token"]
+                )
             if not user:
                 return Response("Unauthorized", status=401)
             self.run_hook(HookMethod.SUCCESS, user)
@@ -84,18 +122,15 @@ class KeycloakSsoServiceMixin:
             self.run_hook(HookMethod.FAILURE)
             return Response("Invalid", status=401)
 
+        if not self._keycloak_call_allowed():
+            return self._keycloak_unavailable_response()
         try:
-            token_payload = self.keycloak.refresh_token(refresh_token=refresh_token)
+            with self._guard_keycloak_call():
+                token_payload = self.keycloak.refresh_token(refresh_token=refresh_token)
         except KeycloakError as e:
             # Decode Keycloak error details and decide if it's serious enough
             # to call failure hook
-            error_code: str = ""
-            try:
-                payload = json.loads(e.response_body.decode("utf-8"))
-                error_code = payload["error"]
-            except Exception:
-                logger.exception("Failed to decode Keycloak error details")
-            if error_code == "invalid_grant":
+            if _get_error_code(e) == "invalid_grant":
                 # This is a normal situation, refresh token exists but expired.
                 # In this case frontend should redirect to login page.
                 logger.debug("Refresh token expired")
@@ -119,7 +154,10 @@ class KeycloakSsoServiceMixin:
             logger.warning("No access token found in cookies")
             return Response("Invalid", status=401)
         auth = AuthenticationService(self.keycloak, self.fetch_user)
-        user = auth.get_user_from_access_token(token)
+        if not self._keycloak_call_allowed():
+            return self._keycloak_unavailable_response()
+        with self._guard_keycloak_call():
+            user = auth.get_user_from_access_token(token)
         if not user:
             return Response("Invalid", status=401)
         return Response("Valid", status=200)
@@ -136,11 +174,16 @@ class KeycloakSsoServiceMixin:
         refresh_token = request.cookies.get(f"{self.sso_cookie_prefix}_refresh-token")
         if not refresh_token:
             logger.warning("No refresh token found in cookies")
-        try:
-            self.keycloak.logout(refresh_token)
-            logger.info("Logged out and invalidated Keycloak refresh token")
-        except KeycloakError:
-            self.run_hook(HookMethod.FAILURE)
+        if not self._keycloak_call_allowed():
+            # still clear local session even if Keycloak can't be reached
+            logger.warning("Skipped Keycloak logout, refresh token not invalidated")
+        else:
+            try:
+                with self._guard_keycloak_call():
+                    self.keycloak.logout(refresh_token)
+                logger.info("Logged out and invalidated Keycloak refresh token")
+            except KeycloakError:
+                self.run_hook(HookMethod.FAILURE)
         response = redirect(self.sso_login_url)
         response.delete_cookie(
             key=f"{self.sso_cookie_prefix}_access-token",
@@ -171,6 +214,45 @@ class KeycloakSsoServiceMixin:
         )
         return response
 
+    def _keycloak_call_allowed(self) -> bool:
+        if self.keycloak_rate_limiter and not self.keycloak_rate_limiter.acquire():
+            logger.warning("Keycloak call rejected: rate limit exceeded")
+            return False
+        if self.keycloak_circuit_breaker and not self.keycloak_circuit_breaker.allow():
+            logger.warning("Keycloak call rejected: circuit breaker open")
+            return False
+        return True
+
+    def _keycloak_unavailable_response(self) -> Response:
+        return Response("Service Unavailable", status=503)
+
+    @contextmanager
+    def _guard_keycloak_call(self) -> Iterator[None]:
+        """
+        Record the outcome of a Keycloak call in the circuit breaker.
+
+        Only connection errors and server errors count as failures. Client
+        errors, such as an expired refresh token or a stale ``code``, mean
+        that Keycloak itself works fine.
+        """
+        breaker = self.keycloak_circuit_breaker
+        try:
+            yield
+        except KeycloakError as e:
+            if breaker:
+                if _is_server_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            raise
+        except BaseException:
+            if breaker:
+                breaker.release()
+            raise
+        else:
+            if breaker:
+                breaker.record_success()
+
     def run_hook(self, hook_method: HookMethod, user: Optional[User] = None) -> None:
         instance_method = getattr(self, hook_method.value, None)
         if instance_method is None:
@@ -178,4 +260,9 @@ class KeycloakSsoServiceMixin:
                 f"Failed to call hook, {self.__class__} doesn't implement {hook_method.value} method"
             )
             return
-        instance_method(user) if user else instance_method()
+        args = (user,) if user else ()
+        dispatcher = self.keycloak_hook_dispatcher
+        if dispatcher is not None and dispatcher.handles(hook_method.value):
+            dispatcher.dispatch(hook_method.value, *args)
+        else:
+            instance_method(*args)
@@ -1,4 +1,6 @@
-from nameko_keycloak.auth import AuthenticationService
+from unittest.mock import MagicMock
+
+from nameko_keycloak.auth import AuthenticationService, WorkerAuthentication
 
 from .models import USERS
 
@@ -66,3 +68,31 @@ def test_authentication_service_get_token_payload_invalid(keycloak):
     decoded_payload = auth.get_token_payload(access_token)
 
     assert decoded_payload == {}
+
+
+def test_worker_authentication_fetches_user_once(keycloak, request_factory):
+    user = USERS["bob@example.com"]
+    token_payload = keycloak.token(code=user.email)
+    request = request_factory()
+    request.cookies = {"my-app_access-token": token_payload["access_token"]}
+    worker_ctx = MagicMock(args=(request,))
+    worker_ctx.service.keycloak = keycloak
+    worker_ctx.service.fetch_user = MagicMock(side_effect=fetch_user)
+    worker_ctx.service.sso_cookie_prefix = "my-app"
+
+    auth = WorkerAuthentication(worker_ctx)
+
+    assert auth.user == user
+    assert auth.get_user_from_request(request) == user
+    assert auth.get_user_from_access_token(token_payload["access_token"]) == user
+    assert worker_ctx.service.fetch_user.call_count == 1
+
+
+def test_worker_authentication_anonymous(keycloak):
+    worker_ctx = MagicMock(args=())
+    worker_ctx.service.keycloak = keycloak
+    worker_ctx.service.fetch_user = fetch_user
+
+    auth = WorkerAuthentication(worker_ctx)
+
+    assert auth.user is None
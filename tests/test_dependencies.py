@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from nameko_keycloak.dependencies import AuthenticationProvider
+
+from .models import USERS
+
+
+def make_worker_ctx(keycloak, request_factory, fetch_user, email):
+    token_payload = keycloak.token(code=email)
+    request = request_factory()
+    request.cookies = {"my-app_access-token": token_payload["access_token"]}
+    worker_ctx = MagicMock(args=(request,))
+    worker_ctx.service.keycloak = keycloak
+    worker_ctx.service.fetch_user = fetch_user
+    worker_ctx.service.sso_cookie_prefix = "my-app"
+    return worker_ctx
+
+
+def test_authentication_provider_fetches_user_once_per_worker(
+    keycloak, request_factory
+):
+    fetch_user = MagicMock(side_effect=lambda email, payload: USERS[email])
+    provider = AuthenticationProvider()
+    bob_ctx = make_worker_ctx(keycloak, request_factory, fetch_user, "bob@example.com")
+    doug_ctx = make_worker_ctx(
+        keycloak, request_factory, fetch_user, "doug@example.com"
+    )
+
+    bob_auth = provider.get_dependency(bob_ctx)
+    doug_auth = provider.get_dependency(doug_ctx)
+
+    assert bob_auth.user == bob_auth.user == USERS["bob@example.com"]
+    assert fetch_user.call_count == 1
+    assert doug_auth.user == doug_auth.user == USERS["doug@example.com"]
+    assert fetch_user.call_count == 2
+    assert bob_auth is not doug_auth
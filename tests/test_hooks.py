@@ -0,0 +1,210 @@
+from unittest.mock import MagicMock
+
+import eventlet
+import pytest
+from nameko.containers import ServiceContainer
+from nameko.extensions import DependencyProvider, Entrypoint
+from nameko.testing.services import dummy
+from nameko.testing.utils import get_extension
+
+from nameko_keycloak.hooks import HookDispatcher, OverflowPolicy, keycloak_hook
+from nameko_keycloak.service import HookMethod, KeycloakSsoServiceMixin
+
+from .models import USERS
+
+
+class WorkerState(DependencyProvider):
+    """
+    Per-worker dependency that is closed in worker teardown.
+    """
+
+    def get_dependency(self, worker_ctx):
+        return worker_ctx.data.setdefault("state", {"open": True})
+
+    def worker_teardown(self, worker_ctx):
+        worker_ctx.data["state"]["open"] = False
+
+
+class Database(DependencyProvider):
+    """
+    Shared dependency that is closed when the service stops.
+    """
+
+    def setup(self):
+        self.open = True
+
+    def stop(self):
+        self.open = False
+
+    def get_dependency(self, worker_ctx):
+        return self
+
+
+class HookService(KeycloakSsoServiceMixin):
+    name = "hook_service"
+    keycloak_hook_dispatcher = HookDispatcher(batch_size=5)
+    state = WorkerState()
+    db = Database()
+    calls: list = []
+
+    @dummy
+    def login(self, *emails):
+        # yield so that the service can be stopped while login is running
+        eventlet.sleep(0.01)
+        for email in emails:
+            self.run_hook(HookMethod.SUCCESS, USERS[email])
+        return self.state
+
+    @dummy
+    def fail(self):
+        self.run_hook(HookMethod.FAILURE)
+
+    @keycloak_hook
+    def keycloak_success(self, user):
+        self.calls.append((user, self.state, self.state["open"], self.db.open))
+
+    def keycloak_failure(self):
+        self.calls.append(("failure", self.state, self.state["open"], self.db.open))
+
+
+class BlockingHookService(HookService):
+    keycloak_hook_dispatcher = HookDispatcher(maxsize=1, overflow=OverflowPolicy.BLOCK)
+
+
+def spawn(container, method_name, *args):
+    # spawn workers directly, entrypoint_hook needs a monkey-patched threading
+    entrypoint = get_extension(container, Entrypoint, method_name=method_name)
+    results = []
+
+    def handle_result(worker_ctx, result, exc_info):
+        results.append(result)
+        return result, exc_info
+
+    container.spawn_worker(entrypoint, args, {}, handle_result=handle_result)
+    return results
+
+
+def call(container, method_name, *args):
+    results = spawn(container, method_name, *args)
+    container._worker_pool.waitall()
+    return results[0]
+
+
+def make_container(service_cls):
+    HookService.calls = []
+    container = ServiceContainer(service_cls, {})
+    container.start()
+    return container
+
+
+@pytest.fixture
+def container():
+    container = make_container(HookService)
+    yield container
+    container.kill()
+
+
+def test_hook_runs_in_own_worker_with_fresh_dependencies(container):
+    user = USERS["bob@example.com"]
+
+    login_state = call(container, "login", user.email)
+    container.stop()
+
+    [(hook_user, hook_state, state_open, db_open)] = HookService.calls
+    assert hook_user == user
+    assert hook_state is not login_state
+    assert state_open
+    assert db_open
+
+
+def test_undecorated_hook_runs_inline(container):
+    call(container, "fail")
+
+    [(_, _, state_open, _)] = HookService.calls
+    assert state_open
+
+
+def test_stop_runs_pending_hooks(container):
+    for _ in range(20):
+        call(container, "login", "bob@example.com")
+
+    container.stop()
+
+    assert len(HookService.calls) == 20
+
+
+def test_stop_runs_hooks_of_running_workers_before_dependencies_stop(container):
+    spawn(container, "login", "bob@example.com", "doug@example.com")
+    eventlet.sleep(0)
+
+    with eventlet.Timeout(2):
+        container.stop()
+
+    assert [call[0].email for call in HookService.calls] == [
+        "bob@example.com",
+        "doug@example.com",
+    ]
+    assert all(db_open for (_, _, _, db_open) in HookService.calls)
+
+
+def test_stop_does_not_block_on_full_queue():
+    container = make_container(BlockingHookService)
+    spawn(container, "login", "bob@example.com", "doug@example.com")
+    eventlet.sleep(0)
+
+    try:
+        with eventlet.Timeout(2):
+            container.stop()
+    finally:
+        container.kill()
+
+    assert len(HookService.calls) == 2
+
+
+def make_dispatcher(**kwargs) -> HookDispatcher:
+    dispatcher = HookDispatcher(**kwargs)
+    dispatcher.container = MagicMock(entrypoints=[])
+    dispatcher.setup()
+    dispatcher.entrypoints = {"hook": MagicMock()}
+    return dispatcher
+
+
+def spawned_args(dispatcher: HookDispatcher) -> list:
+    return [c.args[1] for c in dispatcher.container.spawn_worker.call_args_list]
+
+
+def test_hook_dispatcher_drop_newest():
+    dispatcher = make_dispatcher(maxsize=2, overflow=OverflowPolicy.DROP_NEWEST)
+    for i in range(3):
+        dispatcher.dispatch("hook", i)
+
+    dispatcher.stop()
+
+    assert spawned_args(dispatcher) == [(0,), (1,)]
+    assert dispatcher.dropped == 1
+
+
+def test_hook_dispatcher_drop_oldest():
+    dispatcher = make_dispatcher(maxsize=2, overflow=OverflowPolicy.DROP_OLDEST)
+    for i in range(3):
+        dispatcher.dispatch("hook", i)
+
+    dispatcher.stop()
+
+    assert spawned_args(dispatcher) == [(1,), (2,)]
+    assert dispatcher.dropped == 1
+
+
+def test_hook_dispatcher_stop_waits_for_batch_in_progress():
+    dispatcher = make_dispatcher(batch_size=5)
+    dispatcher.container.spawn_managed_thread = eventlet.spawn
+    # yield inside each spawn, so stop() is called in the middle of a batch
+    dispatcher.container.spawn_worker.side_effect = lambda *args: eventlet.sleep(0)
+    dispatcher.start()
+    for i in range(12):
+        dispatcher.dispatch("hook", i)
+    eventlet.sleep(0)
+
+    dispatcher.stop()
+
+    assert spawned_args(dispatcher) == [(i,) for i in range(12)]
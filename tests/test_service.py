@@ -1,9 +1,11 @@
 import json
 from pathlib import Path
 from typing import Any, Optional
+from unittest.mock import MagicMock, patch
 
 import pytest
-from keycloak.exceptions import KeycloakError
+from keycloak import KeycloakOpenID
+from keycloak.exceptions import KeycloakConnectionError, KeycloakError
 from nameko.testing.services import worker_factory
 from nameko.web.handlers import http
 from werkzeug.http import parse_cookie
@@ -11,6 +13,7 @@ from werkzeug.wrappers import Request, Response
 
 from nameko_keycloak.dependencies import KeycloakProvider
 from nameko_keycloak.fakes import FakeKeycloak
+from nameko_keycloak.resilience import CircuitBreaker, CircuitState, TokenBucket
 from nameko_keycloak.service import KeycloakSsoServiceMixin
 from nameko_keycloak.types import TokenPayload
 
@@ -26,6 +29,7 @@ class MyService(KeycloakSsoServiceMixin):
     sso_token_url = "/token-sso"
     sso_refresh_token_url = "/refresh-token-sso"
     frontend_url = "/frontend"
+    logged_in: list[User]
 
     @http("GET", "/login-sso")
     def login_sso(self, request: Request) -> Response:
@@ -50,10 +54,15 @@ class MyService(KeycloakSsoServiceMixin):
     def fetch_user(self, email: str, token_payload: TokenPayload) -> Optional[User]:
         return USERS.get(email)
 
+    def keycloak_success(self, user: User) -> None:
+        self.logged_in.append(user)
+
 
 @pytest.fixture
 def my_service():
-    return worker_factory(MyService, keycloak=FakeKeycloak())
+    service = worker_factory(MyService, keycloak=FakeKeycloak())
+    service.logged_in = []
+    return service
 
 
 def test_login_sso_redirect_user(my_service, request_factory):
@@ -74,6 +83,16 @@ def test_token_sso_set_cookies(my_service, request_factory):
         cookies_payload = {**cookies_payload, **parse_cookie(cookie)}
     assert f"{MyService.sso_cookie_prefix}_access-token" in cookies_payload
     assert f"{MyService.sso_cookie_prefix}_refresh-token" in cookies_payload
+    assert my_service.logged_in == [user]
+
+
+def test_refresh_token_sso_failure_hook_can_be_patched(my_service, request_factory):
+    request = request_factory()
+
+    with patch.object(MyService, "keycloak_failure", create=True) as hook:
+        my_service.refresh_token_sso(request)
+
+    hook.assert_called_once_with()
 
 
 def test_refresh_token_sso(my_service, request_factory):
@@ -148,3 +167,93 @@ def test_logout_invalidates_refresh_token(my_service, request_factory):
     assert response.status_code == 302
     with pytest.raises(KeycloakError):
         my_service.keycloak.refresh_token(token_payload["refresh_token"])
+
+
+def test_refresh_token_sso_circuit_breaker_fast_fails(request_factory):
+    service = worker_factory(MyService, keycloak=FakeKeycloak())
+    service.keycloak_circuit_breaker = CircuitBreaker(failure_threshold=1)
+    request = request_factory()
+    request.cookies = {f"{MyService.sso_cookie_prefix}_refresh-token": "unknown"}
+
+    response = service.refresh_token_sso(request)
+    assert response.status_code == 401
+
+    response = service.refresh_token_sso(request)
+    assert response.status_code == 503
+
+
+def test_logout_rate_limited(request_factory):
+    service = worker_factory(MyService, keycloak=FakeKeycloak())
+    service.keycloak_rate_limiter = TokenBucket(rate=0, capacity=1)
+    for email in ["bob@example.com", "doug@example.com"]:
+        service.keycloak.token(code=email)
+
+    request = request_factory()
+    request.cookies = {
+        f"{MyService.sso_cookie_prefix}_refresh-token": "bob@example.com"
+    }
+    assert service.logout(request).status_code == 302
+
+    request.cookies = {
+        f"{MyService.sso_cookie_prefix}_refresh-token": "doug@example.com"
+    }
+    response = service.logout(request)
+
+    assert response.status_code == 302
+    deleted_cookies: dict[Any, Any] = {}
+    for cookie in response.headers.getlist("Set-Cookie"):
+        deleted_cookies = {**deleted_cookies, **parse_cookie(cookie)}
+    assert deleted_cookies[f"{MyService.sso_cookie_prefix}_refresh-token"] == ""
+    # Keycloak was not called, so refresh token is still valid
+    assert service.keycloak.refresh_token("doug@example.com")
+
+
+def test_token_sso_invalid_code_does_not_open_circuit_breaker(request_factory):
+    keycloak = MagicMock()
+    keycloak.token.side_effect = KeycloakError(
+        error_message="Code not valid",
+        response_code=400,
+        response_body=b'{"error": "invalid_grant"}',
+    )
+    service = worker_factory(MyService, keycloak=keycloak)
+    service.keycloak_circuit_breaker = CircuitBreaker(failure_threshold=3)
+    request = request_factory(args={"code": "stale"})
+
+    for _ in range(4):
+        with pytest.raises(KeycloakError):
+            service.token_sso(request)
+
+    assert service.keycloak_circuit_breaker.state == CircuitState.CLOSED
+
+
+def test_logout_releases_circuit_breaker_trial_on_error(request_factory):
+    service = worker_factory(MyService, keycloak=FakeKeycloak())
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    service.keycloak_circuit_breaker = breaker
+    request = request_factory()
+    request.cookies = {f"{MyService.sso_cookie_prefix}_refresh-token": "unknown"}
+
+    # FakeKeycloak.logout raises KeyError for unknown tokens
+    with pytest.raises(KeyError):
+        service.logout(request)
+
+    assert breaker.allow()
+
+
+def test_token_sso_certs_connection_error_opens_circuit_breaker(request_factory):
+    keycloak = KeycloakOpenID(
+        server_url="http://keycloak.invalid/", realm_name="test", client_id="test"
+    )
+    keycloak.token = MagicMock(return_value={"access_token": "token"})
+    keycloak.certs = MagicMock(side_effect=KeycloakConnectionError("Can't connect"))
+    service = worker_factory(MyService, keycloak=keycloak)
+    service.keycloak_circuit_breaker = CircuitBreaker(failure_threshold=1)
+    request = request_factory(args={"code": "bob@example.com"})
+
+    with pytest.raises(KeycloakConnectionError):
+        service.token_sso(request)
+
+    assert service.keycloak_circuit_breaker.state == CircuitState.OPEN
+    assert service.token_sso(request).status_code == 503
+    keycloak.certs.assert_called_once()